@@ -24,33 +24,91 @@ New items can be added either by creating a new file in the appropriate director
 """
 
 import argparse
+import concurrent.futures
+import copy
 import datetime
+import functools
+import heapq
+import json
+import math
+import numbers
+import operator
 import os
 import pdb
 import re
 import sys
 import time
 import traceback
-from collections import defaultdict
+import unicodedata
 from dataclasses import asdict, dataclass, field
 
-import git
-import numpy as np
-import pandas as pd
 import yaml
-from tabulate import tabulate
+
+try:
+    from yaml import CSafeDumper as SafeDumper
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
+
+DECK_INDEX = ".index.json"
+DAYS_AGO_RE = re.compile(r"(?P<days>\d+)d")
+INTERVAL_RE = re.compile(r"^(?P<days>\d+)d$")
+ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+CARD_KEYS = {"content", "date", "last_seen", "past_dates", "suspend", "touch"}
+CARD_LINE_RE = re.compile(r"(\w+):(?: (.+))?")
+CARD_ITEM_RE = re.compile(r"- (.+)")
+QUOTED_RE = re.compile(r"'((?:[^']|'')*)'")
+PLAIN_RE = re.compile(r"[A-Za-z](?:[A-Za-z0-9 ,.'()/+-]*[A-Za-z0-9.')])?")
+INT_RE = re.compile(r"-?(?:0|[1-9][0-9]*)")
+FLOAT_RE = re.compile(r"-?(?:0|[1-9][0-9]*)\.[0-9]*(?:[eE][-+][0-9]+)?")
+# Plain words that YAML resolves to something other than a string
+YAML_WORDS = {
+    **dict.fromkeys(("true", "True", "TRUE", "yes", "Yes", "YES"), True),
+    **dict.fromkeys(("on", "On", "ON"), True),
+    **dict.fromkeys(("false", "False", "FALSE", "no", "No", "NO"), False),
+    **dict.fromkeys(("off", "Off", "OFF"), False),
+    **dict.fromkeys(("null", "Null", "NULL"), None),
+}
 
 
 def initialize_repo(path):
+    import git
+
     if not os.path.isdir(os.path.join(path, ".git")):
         repo = git.Repo.init(path)
-        commit_changes(repo)
+        exclude_deck_indexes(repo)
+        # Always make a root commit, even if the folder is empty, so that there is
+        #   something to undo back to
+        repo.git.add(A=True)
+        repo.index.commit("Auto-commit: Script changes")
     else:
         repo = git.Repo(path)
+        exclude_deck_indexes(repo)
     return repo
 
 
+def exclude_deck_indexes(repo):
+    # The deck indexes are caches that can always be rebuilt from the cards, so
+    #   keep them (and any temporary file left by an interrupted write) out of the
+    #   history
+    exclude_path = os.path.join(repo.git_dir, "info", "exclude")
+    try:
+        with open(exclude_path, "r") as file:
+            excluded = file.read().splitlines()
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(exclude_path), exist_ok=True)
+        excluded = []
+    missing = [
+        name for name in (DECK_INDEX, f"{DECK_INDEX}.tmp") if name not in excluded
+    ]
+    if missing:
+        with open(exclude_path, "a") as file:
+            file.write("\n" + "".join(f"{name}\n" for name in missing))
+
+
 def commit_changes(repo):
+    if not repo.is_dirty(untracked_files=True):
+        return
     repo.git.add(A=True)
     repo.index.commit("Auto-commit: Script changes")
 
@@ -84,16 +142,130 @@ class Memory:
             self.new_today = 0
 
 
+@dataclass
+class CardView:
+    path: str
+    touch: float
+    # `date` and `last_seen` are kept as found in the card and only parsed where
+    #   they are needed, so a malformed date doesn't affect unrelated commands
+    date: str | datetime.date | None
+    suspend: bool
+    last_seen: str | datetime.date | None
+    content: str
+    past_dates: list = field(default_factory=list)
+
+
+@dataclass
+class DeckScan:
+    name: str
+    path: str
+    cards: list[CardView]
+
+
+@dataclass
+class DeckResult:
+    name: str
+    path: str
+    due: list[CardView]
+    new: list[CardView]
+    memory: Memory
+
+
 def custom_excepthook(exc_type, exc_value, exc_traceback):
     if exc_type != KeyboardInterrupt:
         traceback.print_exception(exc_type, exc_value, exc_traceback, file=sys.stdout)
         pdb.post_mortem(exc_traceback)
 
 
+def load_yaml(path):
+    with open(path, "r") as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+
+def write_text(text, path):
+    # Leave files that already contain exactly this text untouched
+    try:
+        with open(path, "r") as file:
+            if file.read() == text:
+                return
+    except FileNotFoundError:
+        pass
+    # Write to a temporary file and move it into place so that an interrupted write
+    #   can't leave a truncated file behind
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+
+def dump_yaml(data, path):
+    write_text(yaml.dump(data, Dumper=SafeDumper), path)
+
+
+def parse_card_scalar(value):
+    if m := QUOTED_RE.fullmatch(value):
+        return m.group(1).replace("''", "'")
+    if value in YAML_WORDS:
+        return YAML_WORDS[value]
+    if PLAIN_RE.fullmatch(value):
+        return value
+    if INT_RE.fullmatch(value):
+        return int(value)
+    if FLOAT_RE.fullmatch(value):
+        return float(value)
+    raise ValueError(value)
+
+
+def parse_card(text):
+    # Fast path for cards as written by this script (a few known keys with one-line
+    #   scalars, plus a `past_dates` list); returns None if PyYAML is needed instead
+    data = {}
+    key = None
+    try:
+        for line in text.rstrip("\n").split("\n"):
+            if m := CARD_ITEM_RE.fullmatch(line):
+                if not isinstance(data.get(key), list):
+                    return None
+                data[key].append(parse_card_scalar(m.group(1)))
+            elif (m := CARD_LINE_RE.fullmatch(line)) and m.group(1) in CARD_KEYS:
+                key, value = m.groups()
+                data[key] = [] if value is None else parse_card_scalar(value)
+            else:
+                return None
+    except ValueError:
+        return None
+    if [] in data.values():
+        # `key:` with nothing after it is null, not an empty list
+        return None
+    return data
+
+
+@functools.lru_cache(maxsize=None)
+def load_card(file_path, mtime_ns):
+    # Each card is parsed at most once per run. Since mtime_ns is part of the cache
+    #   key, a card rewritten by write_card() is simply reparsed. The cached dicts
+    #   must not be modified; use read_card() to get a copy
+    with open(file_path, "r") as file:
+        text = file.read()
+    data = parse_card(text)
+    if data is None:
+        data = yaml.load(text, Loader=SafeLoader)
+    return {} if data is None else data
+
+
+def read_card(file_path, mtime_ns=None):
+    if mtime_ns is None:
+        mtime_ns = os.stat(file_path).st_mtime_ns
+    return copy.deepcopy(load_card(file_path, mtime_ns))
+
+
+def write_card(file_path, data):
+    dump_yaml(data, file_path)
+
+
 def load_dataclass_from_yaml(config_path, data_cls, default_value=None):
     if os.path.exists(config_path):
-        with open(config_path, "r") as file:
-            yaml_values = yaml.safe_load(file)
+        yaml_values = load_yaml(config_path)
     elif default_value is not None:
         return default_value
     else:
@@ -109,215 +281,358 @@ def name_to_folder(folder):
     return folder.replace(" ", "_")
 
 
+def is_card_yaml(file_name):
+    return (
+        file_name.endswith(".yaml")
+        and not file_name.endswith(".memory.yaml")
+        and file_name != "config.yaml"
+    )
+
+
+def index_entry(stat, data):
+    try:
+        # Cards that don't survive a round trip through JSON (e.g., because YAML
+        #   parsed an unquoted date) are left out of the index and always reread
+        if json.loads(json.dumps(data)) != data:
+            data = None
+    except (TypeError, ValueError):
+        data = None
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "data": data}
+
+
+def read_deck_cards(subfolder_path):
+    # Parsed cards are cached in the deck's .index.json; a card is only reread when it
+    #   isn't there or its mtime or size changed, and the index is then rewritten
+    index_path = os.path.join(subfolder_path, DECK_INDEX)
+    try:
+        with open(index_path, "r") as file:
+            index = json.load(file)
+    except (FileNotFoundError, ValueError):
+        index = {}
+
+    cards = []
+    new_index = {}
+    with os.scandir(subfolder_path) as it:
+        for entry in it:
+            if not is_card_yaml(entry.name):
+                continue
+            stat = entry.stat()
+            indexed = index.get(entry.name)
+            if (
+                indexed is not None
+                and indexed["data"] is not None
+                and indexed["mtime_ns"] == stat.st_mtime_ns
+                and indexed["size"] == stat.st_size
+            ):
+                data = indexed["data"]
+                new_index[entry.name] = indexed
+            else:
+                data = read_card(entry.path, stat.st_mtime_ns)
+                new_index[entry.name] = index_entry(stat, data)
+            cards.append((entry, data))
+
+    if new_index != index:
+        # The index is only a cache, so a deck folder that can't be written to
+        #   shouldn't stop read-only commands from working
+        try:
+            write_text(json.dumps(new_index), index_path)
+        except OSError:
+            pass
+    return cards
+
+
+def to_date(value):
+    if not isinstance(value, str):
+        return value
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        # Hand-edited cards may have dates that aren't zero-padded, e.g. 2024-1-5
+        return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def scan_deck(subfolder_path):
+    cards = []
+    for entry, data in read_deck_cards(subfolder_path):
+        cards.append(
+            CardView(
+                path=entry.path,
+                touch=data["touch"] if "touch" in data else entry.stat().st_mtime,
+                date=data.get("date", None),
+                suspend=data.get("suspend", False),
+                last_seen=data.get("last_seen", None),
+                content=data.get(
+                    "content", os.path.splitext(entry.name)[0].replace("_", " ")
+                ),
+                past_dates=data.get("past_dates") or [],
+            )
+        )
+    name = folder_to_name(os.path.basename(os.path.normpath(subfolder_path)))
+    return DeckScan(name, subfolder_path, cards)
+
+
+def build_scan(folder, jobs=1):
+    # Every deck is listed and its cards parsed once per run; the result is shared by
+    #   everything that looks at the cards
+    with os.scandir(folder) as it:
+        subfolders = [
+            entry.path for entry in it if entry.is_dir() and entry.name != ".git"
+        ]
+    return map_decks(scan_deck, subfolders, jobs)
+
+
 def see_new(folder, deck_name):
-    out = []
-    deck_folder = os.path.join(folder, name_to_folder(deck_name))
-    for file in os.listdir(deck_folder):
-        if file.endswith(".yaml") and not file.endswith(".memory.yaml"):
-            file_path = os.path.join(deck_folder, file)
-
-            with open(file_path, "r") as yaml_file:
-                data = yaml.safe_load(yaml_file)
-            if data is None:
-                data = {}
-            touch_time = data.get("touch", os.path.getmtime(file_path))
-            file_date = data.get("date", None)
-            if file_date is None:
-                out.append((file_path, touch_time))
-    out.sort(key=lambda x: x[1])
-    return [x[0] for x in out]
-
-
-def process_folders(folder, global_config, peek):
-    result = defaultdict(dict)
-    current_date = datetime.date.today()
-
-    for subfolder in os.listdir(folder):
-        subfolder_path = os.path.join(folder, subfolder)
-
-        if os.path.isdir(subfolder_path):
-            result_key = folder_to_name(subfolder)
-            files_list = []
-            new_list = []
-
-            local_config_path = os.path.join(subfolder_path, "config.yaml")
-            local_config = load_dataclass_from_yaml(
-                local_config_path, Config, global_config
+    deck_scan = scan_deck(os.path.join(folder, name_to_folder(deck_name)))
+    out = [card for card in deck_scan.cards if card.date is None]
+    out.sort(key=operator.attrgetter("touch"))
+    return [card.path for card in out]
+
+
+def process_deck(deck_scan, global_config, cutoff, memory=None):
+    files_list = []
+    new_list = []
+
+    local_config_path = os.path.join(deck_scan.path, "config.yaml")
+    local_config = load_dataclass_from_yaml(local_config_path, Config, global_config)
+
+    if memory is None:
+        memory_path = os.path.join(deck_scan.path, ".memory.yaml")
+        memory = load_dataclass_from_yaml(memory_path, Memory)
+
+    for card in deck_scan.cards:
+        if card.suspend:
+            continue
+        if card.date is None:
+            new_list.append(card)
+        elif to_date(card.date) <= cutoff:
+            files_list.append(card)
+
+    if not files_list and not new_list:
+        return None
+
+    lists = []
+    for list_, max_, today_ in zip(
+        (files_list, new_list),
+        (local_config.max_reviews_per_day, local_config.max_new_per_day),
+        (memory.reviews_today, memory.new_today),
+    ):
+        # Sort by modification time, only keeping the first `max_` cards if there is a
+        #   daily limit
+        if max_ is None:
+            list_.sort(key=operator.attrgetter("touch"))
+        else:
+            list_ = heapq.nsmallest(
+                max_ - today_, list_, key=operator.attrgetter("touch")
             )
+        lists.append(list_)
+
+    due, new = lists
+    return DeckResult(deck_scan.name, deck_scan.path, due, new, memory)
 
-            memory_path = os.path.join(subfolder_path, ".memory.yaml")
-            memory = load_dataclass_from_yaml(memory_path, Memory)
-
-            for file in os.listdir(subfolder_path):
-                if file.endswith(".yaml") and not (
-                    file.endswith(".memory.yaml") or file.endswith("config.yaml")
-                ):
-                    file_path = os.path.join(subfolder_path, file)
-
-                    with open(file_path, "r") as yaml_file:
-                        data = yaml.safe_load(yaml_file)
-                    if data is None:
-                        data = {}
-                    if data.get("suspend", False):
-                        continue
-                    touch_time = data.get("touch", os.path.getmtime(file_path))
-                    file_date = data.get("date", None)
-                    if file_date is None:
-                        new_list.append((file_path, touch_time))
-                        continue
-                    if isinstance(file_date, str):
-                        file_date = datetime.datetime.strptime(
-                            file_date, "%Y-%m-%d"
-                        ).date()
-
-                    if file_date <= current_date + datetime.timedelta(days=int(peek)):
-                        # print(datetime.datetime.fromtimestamp(mod_time), file_path)
-                        files_list.append((file_path, touch_time))
-
-            for key, list_, max_, today_ in zip(
-                ("due", "new"),
-                (files_list, new_list),
-                (local_config.max_reviews_per_day, local_config.max_new_per_day),
-                (memory.reviews_today, memory.new_today),
-            ):
-                if max_ is not None:
-                    max_ -= today_
-                list_.sort(key=lambda x: x[1])  # Sort by modification time
-                if list_:
-                    result[result_key][key] = [f[0] for f in list_][:max_]
-                    result[result_key]["memory"] = memory
-                    result[result_key]["path"] = subfolder_path
+
+def get_cutoff(peek):
+    return datetime.date.today() + datetime.timedelta(days=int(peek))
+
+
+def map_decks(func, subfolders, jobs=1):
+    # Decks are independent of each other, so they can be scanned concurrently;
+    #   results are returned in the same order as `subfolders`
+    if jobs > 1 and len(subfolders) > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(func, subfolders))
+    return [func(subfolder) for subfolder in subfolders]
+
+
+def process_folders(scan, global_config, peek):
+    result = []
+    cutoff = get_cutoff(peek)
+
+    for deck_scan in scan:
+        deck = process_deck(deck_scan, global_config, cutoff)
+        if deck is not None:
+            result.append(deck)
 
     return result
 
 
-def get_studied_cards(folder, date):
-    accumulator = []
+def refresh_decks(decks, deck_names, global_config, peek):
+    # Rescan only the decks whose cards were changed by responses, keeping their
+    #   in-memory Memory (and their position in `decks`); every other deck is
+    #   already up to date
+    cutoff = get_cutoff(peek)
+    refreshed = []
+    for deck in decks:
+        if deck.name in deck_names:
+            deck = process_deck(
+                scan_deck(deck.path), global_config, cutoff, deck.memory
+            )
+            if deck is None:
+                continue
+        refreshed.append(deck)
+    return refreshed
 
-    if m := re.match(r"(?P<days>\d+)d", date):
-        date = (
-            datetime.date.today() + datetime.timedelta(days=-1 * int(m.group("days")))
-        ).strftime("%Y-%m-%d")
 
-    current_date = datetime.date.today().strftime("%Y-%m-%d")
-    assert date <= current_date
-    for subfolder in os.listdir(folder):
-        if subfolder == ".git":
-            continue
-        subfolder_path = os.path.join(folder, subfolder)
-
-        if os.path.isdir(subfolder_path):
-            deck_name = folder_to_name(subfolder)
-            files_list = []
-            for file in os.listdir(subfolder_path):
-                if file.endswith(".yaml") and not (
-                    file.endswith(".memory.yaml") or file.endswith("config.yaml")
-                ):
-                    file_path = os.path.join(subfolder_path, file)
-
-                    with open(file_path, "r") as yaml_file:
-                        data = yaml.safe_load(yaml_file)
-                    touch_time = data.get("touch", os.path.getmtime(file_path))
-                    file_date = data.get("last_seen", None)
-                    past_dates = data.get("past_dates", [])
-                    if file_date is None and not past_dates:
-                        continue
-                    if file_date == date or date in past_dates:
-                        content = data.get(
-                            "content",
-                            os.path.splitext(os.path.basename(file_path))[0].replace(
-                                "_", " "
-                            ),
-                        )
-                        files_list.append((content, touch_time))
-            files_list.sort(key=lambda x: x[1])  # Sort by modification time
-            for file, _ in files_list:
-                accumulator.append({"Deck": deck_name, f"Card studied on {date}": file})
-
-    df = pd.DataFrame(accumulator)
-    print(tabulate(df, headers=df.columns))  # type:ignore
-
-
-def create_dataframe_from_yaml(data_dict, all=False, jitter=None):
-    data_list = []
-
-    def _append_item(file_path, new, n_due, n_new):
-        with open(file_path, "r") as yaml_file:
-            data = yaml.safe_load(yaml_file)
-        if data is None:
-            data = {}
-
-        content = data.get(
-            "content",
-            os.path.splitext(os.path.basename(file_path))[0].replace("_", " "),
+def get_studied_cards(scan, date):
+    rows = []
+
+    today = datetime.date.today()
+    if m := DAYS_AGO_RE.match(date):
+        date = (today + datetime.timedelta(days=-1 * int(m.group("days")))).strftime(
+            "%Y-%m-%d"
         )
-        last_seen = data.get("last_seen", None)
-        if isinstance(last_seen, str):
-            last_seen = datetime.datetime.strptime(last_seen, "%Y-%m-%d").date()
 
-        if last_seen is None:
+    current_date = today.strftime("%Y-%m-%d")
+    assert date <= current_date
+
+    for deck_scan in scan:
+        studied = [
+            card
+            for card in deck_scan.cards
+            if card.last_seen == date or date in card.past_dates
+        ]
+        studied.sort(key=operator.attrgetter("touch"))  # Sort by modification time
+        for card in studied:
+            rows.append([deck_scan.name, card.content])
+
+    headers = ["Deck", f"Card studied on {date}"]
+    print(format_table(rows, headers, index=range(len(rows))))
+
+
+def create_dataframe_from_yaml(decks, all=False, jitter=None, seed=None):
+    import numpy as np
+    import pandas as pd
+
+    deck_names = []
+    n_dues = []
+    n_news = []
+    files = []
+    top_cards = []
+    goods = []
+    today = datetime.date.today()
+
+    def _append_item(deck_name, card, new, n_due, n_new):
+        if card.last_seen is None:
             interval = 1
         else:
-            interval = (datetime.date.today() - last_seen).days
-        data_list.append(
-            [
-                key,
-                n_due,
-                n_new,
-                file_path,
-                content + (" (new)" if new else ""),
-                interval,
-            ]
-        )
-
-    for key in data_dict:
-        due_list = data_dict[key].get("due", ())
-        new_list = data_dict[key].get("new", ())
-        if due_list or new_list:
-            if not all:
-                if due_list:
-                    file_path = due_list[0]
-                    new = False
-                else:
-                    file_path = new_list[0]
-                    new = True
-                _append_item(file_path, new, len(due_list), len(new_list))
+            interval = (today - to_date(card.last_seen)).days
+        deck_names.append(deck_name)
+        n_dues.append(n_due)
+        n_news.append(n_new)
+        files.append(card.path)
+        top_cards.append(card.content + (" (new)" if new else ""))
+        goods.append(interval)
+
+    for deck in decks:
+        n_due = len(deck.due)
+        n_new = len(deck.new)
+        if not n_due and not n_new:
+            # Every card was held back by the daily limits
+            continue
+        if not all:
+            if deck.due:
+                _append_item(deck.name, deck.due[0], False, n_due, n_new)
             else:
-                for file_path in due_list:
-                    _append_item(file_path, False, len(due_list), len(new_list))
-                for file_path in new_list:
-                    _append_item(file_path, True, len(due_list), len(new_list))
+                _append_item(deck.name, deck.new[0], True, n_due, n_new)
+        else:
+            for card in deck.due:
+                _append_item(deck.name, card, False, n_due, n_new)
+            for card in deck.new:
+                _append_item(deck.name, card, True, n_due, n_new)
 
     df = pd.DataFrame(
-        data_list, columns=["Deck", "N due", "N new", "File", "Top card", "Good"]
+        {
+            "Deck": deck_names,
+            "N due": np.asarray(n_dues, dtype=np.int32),
+            "N new": np.asarray(n_news, dtype=np.int32),
+            "File": files,
+            "Top card": top_cards,
+            "Good": np.asarray(goods, dtype=np.int32),
+        }
     )
     if jitter is not None:
-        jitter_amt = np.random.random(len(df)) * 2 * jitter - jitter + 1
-        df["Good"] = (df["Good"] * jitter_amt).round().astype(int)
-    df["Hard"] = df["Good"] // 2
-    df.loc[df["Hard"] < 1, "Hard"] = 1
-    df["Easy"] = df["Good"] * 2
+        rng = np.random.default_rng(seed)
+        jitter_amt = rng.random(len(df), dtype=np.float32)
+        jitter_amt *= 2 * jitter
+        jitter_amt += 1 - jitter
+        np.multiply(df["Good"].to_numpy(), jitter_amt, out=jitter_amt)
+        np.rint(jitter_amt, out=jitter_amt)
+        df["Good"] = jitter_amt.astype(np.int32)
+    good = df["Good"].to_numpy()
+    df["Hard"] = np.maximum(good // 2, 1)
+    df["Easy"] = good * 2
 
     df.index += 1
     return df
 
 
-def print_df(df):
-    df = df[["Deck", "N due", "N new", "Top card", "Hard", "Good", "Easy"]]
+def is_number(value):
+    # Like tabulate, strings that look like numbers (e.g. a card called "1984") count
+    #   as numbers too
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, numbers.Number):
+        return True
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return False
+    if math.isinf(number) or math.isnan(number):
+        return value.lower() in {"inf", "-inf", "nan"}
+    return True
+
+
+def display_width(text):
+    # Wide (e.g. CJK) characters take up two columns in a terminal and combining
+    #   characters none
+    width = 0
+    for char in text:
+        if unicodedata.combining(char):
+            continue
+        width += 2 if unicodedata.east_asian_width(char) in "WF" else 1
+    return width
+
+
+def format_table(rows, headers, index=None):
+    # Lay out `rows` like tabulate's "simple" format, right-aligning numeric columns;
+    #   `index`, if given, is shown as an unnamed first column
+    rows = [list(row) for row in rows]
+    headers = list(headers)
+    if index is not None and rows:
+        rows = [[label, *row] for label, row in zip(index, rows)]
+        headers = ["", *headers]
+    cells = [[str(value) for value in row] for row in rows]
+    widths = [
+        max([display_width(header) + 2, *(display_width(row[i]) for row in cells)])
+        for i, header in enumerate(headers)
+    ]
+    numeric = [
+        bool(rows) and all(is_number(row[i]) for row in rows)
+        for i in range(len(headers))
+    ]
+
+    def _format_row(values):
+        padded = []
+        for value, width, is_numeric in zip(values, widths, numeric):
+            padding = " " * (width - display_width(value))
+            padded.append(padding + value if is_numeric else value + padding)
+        return "  ".join(padded).rstrip()
+
+    lines = [_format_row(headers), "  ".join("-" * width for width in widths)]
+    lines.extend(_format_row(row) for row in cells)
+    return "\n".join(lines)
 
-    add_d = lambda x: f"{x}d"
 
-    # In order to avoid `utureWarning: Setting an item of incompatible dtype is
-    #   deprecated and will raise in a future error of pandas,` we seemingly need
-    #   to drop the columns and then re-add them.
-    hard_days = df["Hard"].apply(add_d).astype(str)
-    good_days = df["Good"].apply(add_d).astype(str)
-    easy_days = df["Easy"].apply(add_d).astype(str)
-    df = df.drop(["Hard", "Good", "Easy"], axis=1)
-    df["Hard"] = hard_days
-    df["Good"] = good_days
-    df["Easy"] = easy_days
-    print(tabulate(df, headers=df.columns))
+def print_df(df):
+    import numpy as np
+
+    # Building a new frame with `assign` (rather than overwriting the integer
+    #   columns in place) avoids pandas' incompatible-dtype FutureWarning
+    days = {
+        col: np.char.add(df[col].to_numpy().astype(str), "d")
+        for col in ("Hard", "Good", "Easy")
+    }
+    df = df[["Deck", "N due", "N new", "Top card"]].assign(**days)
+    print(format_table(df.itertuples(index=False, name=None), df.columns, df.index))
 
 
 def update_yaml_from_df(df, i, response):
@@ -325,61 +640,50 @@ def update_yaml_from_df(df, i, response):
         print(f"Error: {i} is not an active deck")
         return
 
-    file_path = df.at[i, "File"]
+    row = df.loc[i]
+    file_path = row["File"]
+    deck_name = row["Deck"]
+    top_card = row["Top card"]
 
     if response == "Cycle":
         # Read the YAML file
-        with open(file_path, "r") as file:
-            data = yaml.safe_load(file)
-        if data is None:
-            data = {}
+        data = read_card(file_path)
         data["touch"] = time.time()
-        with open(file_path, "w") as file:
-            yaml.safe_dump(data, file)
-        print(
-            f"Cycled {df.at[i, 'Deck']}: {df.at[i, 'Top card']} to back of today's cards"
-        )
+        write_card(file_path, data)
+        print(f"Cycled {deck_name}: {top_card} to back of today's cards")
         return
 
-    is_new = df.at[i, "N due"] <= 0
-    deck_name = df.at[i, "Deck"]
+    is_new = row["N due"] <= 0
 
     if response == "Suspend":
-        with open(file_path, "r") as file:
-            data = yaml.safe_load(file)
+        data = read_card(file_path)
         data["suspend"] = True
-        with open(file_path, "w") as file:
-            yaml.safe_dump(data, file)
-        print(f"Suspended {deck_name}: {df.at[i, 'Top card']}")
+        write_card(file_path, data)
+        print(f"Suspended {deck_name}: {top_card}")
         return deck_name, is_new
 
     if response == "Forget":
-        with open(file_path, "r") as file:
-            data = yaml.safe_load(file)
+        data = read_card(file_path)
         assert isinstance(data, dict)
         data.pop("last_seen", None)
         data.pop("date", None)
         # We don't need to remove "past_dates" because (as far as I can tell) it is
         #   only used to print the study history
-        with open(file_path, "w") as file:
-            yaml.safe_dump(data, file)
-        print(f"Forgot {deck_name}: {df.at[i, 'Top card']}")
+        write_card(file_path, data)
+        print(f"Forgot {deck_name}: {top_card}")
         return deck_name, is_new
 
     if response == "Bury":
         if is_new:
             raise ValueError("Can't bury new cards")
         interval = 1
-    elif re.match(r"^\d+d$", response):
-        interval = int(response[:-1])
+    elif m := INTERVAL_RE.match(response):
+        interval = int(m.group("days"))
     else:
-        interval = df.at[i, response]
+        interval = row[response]
 
     # Read the YAML file
-    with open(file_path, "r") as file:
-        data = yaml.safe_load(file)
-    if data is None:
-        data = {}
+    data = read_card(file_path)
 
     # Update the dictionary
     today_date = datetime.date.today()
@@ -394,10 +698,9 @@ def update_yaml_from_df(df, i, response):
     data["date"] = future_date.strftime("%Y-%m-%d")
 
     # Write back to the YAML file
-    with open(file_path, "w") as file:
-        yaml.safe_dump(data, file)
+    write_card(file_path, data)
 
-    print(f"Updated {deck_name}: {df.at[i, 'Top card']}. New due date: {future_date}")
+    print(f"Updated {deck_name}: {top_card}. New due date: {future_date}")
     return deck_name, is_new
 
 
@@ -435,6 +738,18 @@ def parse_args():
     parser.add_argument(
         "--debug", action="store_true", help="enter debuger on exception"
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="scan decks with N threads (default: 1)",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="rescan all decks after applying responses and check the result",
+    )
     args, remaining = parser.parse_known_args()
 
     if args.add:
@@ -455,7 +770,7 @@ def parse_args():
                     "Cycle",
                     "Suspend",
                     "Forget",
-                } or re.match(r"^\d+d$", response)
+                } or INTERVAL_RE.match(response)
                 responses.append((i, response))
         except:
             # TODO: (Malcolm 2024-01-10) improve this help
@@ -496,38 +811,36 @@ def add_item(folder, deck, card, due):
     data = {}
     data["touch"] = time.time()
     if due:
-        assert re.match(r"\d{4}-\d{2}-\d{2}", due)
+        assert ISO_DATE_RE.match(due)
         data["date"] = due
-    with open(file_path, "w") as file:
-        yaml.safe_dump(data, file)
+    dump_yaml(data, file_path)
 
 
-def update_memory(folder_contents, result):
+def update_memory(decks_by_name, result):
     deck_name, is_new = result
-    memory = folder_contents[deck_name]["memory"]
+    memory = decks_by_name[deck_name].memory
     if is_new:
         memory.new_today += 1
     else:
         memory.reviews_today += 1
 
 
-def write_memories(folder_contents):
-    for values in folder_contents.values():
-        folder_path = values["path"]
-        memory = values["memory"]
-        memory_dict = asdict(memory)
-        with open(os.path.join(folder_path, ".memory.yaml"), "w") as outf:
-            yaml.dump(memory_dict, outf)
+def write_memories(decks):
+    for deck in decks:
+        memory_dict = asdict(deck.memory)
+        dump_yaml(memory_dict, os.path.join(deck.path, ".memory.yaml"))
 
 
 if __name__ == "__main__":
-    pd.set_option("display.max_colwidth", 100)
     args, responses = parse_args()
-    repo = initialize_repo(args.input_folder)
+    if args.undo or args.add_deck or args.add or responses:
+        repo = initialize_repo(args.input_folder)
+    else:
+        # Nothing will be written, so there's no need to open (or create) the repo
+        repo = None
     changes = False
     config_path = os.path.join(args.input_folder, "config.yaml")
     global_config = load_dataclass_from_yaml(config_path, Config)
-    np.random.seed(global_config.seed)
     if args.debug:
         sys.excepthook = custom_excepthook
     if args.undo:
@@ -537,11 +850,11 @@ if __name__ == "__main__":
             new_files = see_new(args.input_folder, deck_name)
             if not new_files:
                 new_files = ["No new files"]
-            print(tabulate([[n] for n in new_files], headers=[deck_name]))
+            print(format_table([[n] for n in new_files], [deck_name]))
             print("")
         sys.exit(0)
     if args.see_studied:
-        get_studied_cards(args.input_folder, args.see_studied)
+        get_studied_cards(build_scan(args.input_folder, args.jobs), args.see_studied)
         sys.exit(0)
 
     if args.add_deck:
@@ -557,21 +870,36 @@ if __name__ == "__main__":
         print("'--due' has no effect if not adding a card")
         sys.exit(1)
 
+    scan = build_scan(args.input_folder, args.jobs)
+    decks = process_folders(scan, global_config, args.peek)
+
     if responses:
         changes = True
-        folder_contents = process_folders(args.input_folder, global_config, args.peek)
-        df = create_dataframe_from_yaml(folder_contents, args.all, global_config.jitter)
+        df = create_dataframe_from_yaml(
+            decks, args.all, global_config.jitter, global_config.seed
+        )
 
+        decks_by_name = {deck.name: deck for deck in decks}
+        changed_decks = set()
         for i, response in responses:
             result = update_yaml_from_df(df, i, response)
+            if i in df.index:
+                changed_decks.add(df.at[i, "Deck"])
             if result is not None:
-                update_memory(folder_contents, result)
-                write_memories(folder_contents)
+                update_memory(decks_by_name, result)
+        write_memories(decks)
 
-    folder_contents = process_folders(args.input_folder, global_config, args.peek)
-    df = create_dataframe_from_yaml(folder_contents, args.all, global_config.jitter)
+        decks = refresh_decks(decks, changed_decks, global_config, args.peek)
+        if args.verify:
+            assert decks == process_folders(
+                build_scan(args.input_folder, args.jobs), global_config, args.peek
+            ), "Error: updated decks differ from a full rescan"
+
+    df = create_dataframe_from_yaml(
+        decks, args.all, global_config.jitter, global_config.seed
+    )
 
     print_df(df)
     if changes:
-        write_memories(folder_contents)
+        write_memories(decks)
         commit_changes(repo)